@@ -1,14 +1,24 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, Request, Response, UploadFile, File, HTTPException
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+from cachetools import TTLCache
 from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+import httpx
 from docx import Document as DocxDocument
+from lxml import etree
 from pypdf import PdfReader
-import io
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import json
 import os
+import threading
 import textwrap
+import zipfile
 from pathlib import Path # Used for reliable path resolution
 import mimetypes # Used for robust MIME type detection
 
@@ -34,44 +44,309 @@ app.add_middleware(
 
 # --- GOOGLE GENAI CLIENT ---
 
+# The singleton client below owns one long-lived httpx transport, so every call
+# reuses a pooled TLS connection to the Gemini API instead of paying a fresh
+# handshake (~50-200ms). HTTP/2 lets concurrent in-flight calls (asyncio.gather,
+# streaming) multiplex over that single connection rather than opening sockets.
+GEMINI_HTTP_OPTIONS = genai_types.HttpOptions(
+    async_client_args={
+        "http2": True,
+        "limits": httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+    },
+)
+
+# Created once at import: genai.Client is reusable across requests, and building
+# it per request re-pays credential discovery and connection setup on every call.
+# If startup init fails (e.g. missing API key), defer the 500 to request time.
+try:
+    GEMINI_CLIENT = genai.Client(http_options=GEMINI_HTTP_OPTIONS)
+except Exception as e:
+    print(f"Gemini client init deferred (startup error: {e})")
+    GEMINI_CLIENT = None
+
 def get_gemini_client():
-    """Initializes and returns the Gemini client."""
-    try:
-        return genai.Client() 
-    except Exception:
-        raise HTTPException(status_code=500, detail="Gemini API Key is missing or invalid. Check environment variables.")
+    """Returns the shared Gemini client, retrying initialization if it failed at startup."""
+    global GEMINI_CLIENT
+    if GEMINI_CLIENT is None:
+        try:
+            GEMINI_CLIENT = genai.Client(http_options=GEMINI_HTTP_OPTIONS)
+        except Exception:
+            raise HTTPException(status_code=500, detail="Gemini API Key is missing or invalid. Check environment variables.")
+    return GEMINI_CLIENT
+
+# --- SERVER-SIDE DOCUMENT STORE ---
+
+# Maps document_id (truncated sha256 of the extracted text) -> extracted text, so
+# the frontend can reference an uploaded document by id on every chat/summary turn
+# instead of re-posting the entire text with each request.
+DOCUMENT_STORE: TTLCache = TTLCache(maxsize=256, ttl=3600)
+
+
+def store_document_text(extracted_text: str) -> str:
+    """Registers extracted document text in the store and returns its document_id."""
+    doc_id = hashlib.sha256(extracted_text.encode("utf-8")).hexdigest()[:16]
+    DOCUMENT_STORE[doc_id] = extracted_text
+    return doc_id
+
+
+def resolve_document_text(request) -> str:
+    """Returns the document text for a request, resolving document_id via the store."""
+    if request.document_text is not None:
+        return request.document_text
+    if request.document_id:
+        text = DOCUMENT_STORE.get(request.document_id)
+        if text is not None:
+            return text
+        raise HTTPException(status_code=404, detail="Unknown or expired document_id. Please re-upload the document.")
+    raise HTTPException(status_code=400, detail="Either document_text or document_id must be provided.")
+
+
+# --- GEMINI RESPONSE CACHE ---
+
+# The AI endpoints are idempotent: identical inputs produce the same prompt, so
+# completed Gemini responses are reused for a day instead of paying full latency
+# and token cost again. Failed calls are never cached.
+GEMINI_RESPONSE_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=86400)
+GEMINI_RESPONSE_CACHE_LOCK = threading.Lock()
+
+
+def response_cache_key(*parts: str) -> str:
+    """Builds a stable cache key from the strings that determine a Gemini response."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def response_cache_get(key: str):
+    with GEMINI_RESPONSE_CACHE_LOCK:
+        return GEMINI_RESPONSE_CACHE.get(key)
+
+
+def response_cache_put(key: str, text: str) -> None:
+    with GEMINI_RESPONSE_CACHE_LOCK:
+        GEMINI_RESPONSE_CACHE[key] = text
+
+
+# --- GEMINI CONTEXT CACHE REGISTRY ---
+
+# TTL for explicit Gemini context caches (one hour covers a typical review session)
+DOCUMENT_CACHE_TTL_SECONDS = 3600
+DOCUMENT_CACHE_TTL = f"{DOCUMENT_CACHE_TTL_SECONDS}s"
+
+# Maps sha256(document_text) -> Gemini cache resource name, so re-uploading the
+# same document reuses the existing server-side cache instead of creating a new
+# one. Entries expire on the same schedule as the Gemini caches they point at,
+# so a dead cache name is never handed back after the server-side TTL lapses.
+DOCUMENT_CACHE_REGISTRY: TTLCache = TTLCache(maxsize=256, ttl=DOCUMENT_CACHE_TTL_SECONDS)
+
+CACHE_SYSTEM_INSTRUCTION = (
+    "You are a professional Legal Assistant. Answer questions and produce reports "
+    "based STRICTLY AND ONLY on the legal document provided in the cached context."
+)
+
+
+# --- PROMPT TEMPLATES ---
+
+# Dedented once at import. Each prompt is assembled as PREFIX + document_text +
+# SUFFIX.format(...), keeping the static prefix byte-identical across requests
+# (which implicit prefix caching requires) and avoiding per-request dedent work.
+
+CHAT_PROMPT_PREFIX = textwrap.dedent("""
+    You are a professional Legal Assistant, named the 'Conversational Legal Twin'.
+    Your primary function is to simplify complex legal information and answer the user's question
+    based **STRICTLY AND ONLY** on the legal document provided below.
+
+    If you cannot find a direct answer or relevant clause in the document, state clearly:
+    "The answer to that question could not be found in the provided document."
+
+    --- LEGAL DOCUMENT TEXT ---
+    """)
+
+CHAT_PROMPT_SUFFIX_TMPL = "\n--- END OF DOCUMENT ---\n\nUSER QUESTION: {question}\n"
+
+REWRITE_PROMPT_PREFIX = textwrap.dedent("""
+    You are an expert Plain Language Translator. Your task is to rewrite the
+    following legal clause into simple, easy-to-understand English.
+    The rewritten text must preserve the full original legal meaning and risk, but use
+    no legal jargon.
+
+    --- ORIGINAL CLAUSE ---
+    """)
+
+PERSONALIZED_PROMPT_PREFIX = textwrap.dedent("""
+    You are a professional Legal Summarizer. Your task is to produce a concise,
+    plain-English summary of the document below, focused on what matters most to
+    the user's role (given at the end): their obligations, their rights, key dates,
+    and financial commitments. Use short markdown bullet points.
+
+    --- LEGAL DOCUMENT TEXT ---
+    """)
+
+RISK_PROMPT_PREFIX = textwrap.dedent("""
+    You are a high-level Contract Risk Analyst. Your task is to generate a comprehensive,
+    structured risk report for the user's role (given at the end) based on the document below.
+    The output must be formatted with the main title and section headings in markdown.
+
+    1. **Identify the Top 3 Financial Risks** to the user's role.
+    2. **Identify the Top 3 Legal/Compliance Risks** (e.g., breach of contract, loss of rights).
+    3. For each risk, cite the **relevant Section number** and provide a brief **mitigation suggestion** (e.g., "Always pay by the 1st").
+
+    --- LEGAL DOCUMENT TEXT ---
+    """)
+
+ROLE_PROMPT_SUFFIX_TMPL = "\n--- END OF DOCUMENT ---\n\nUSER ROLE: {user_role}\n"
+
+# Used when the document itself is referenced via a Gemini context cache.
+RISK_CACHED_PROMPT_TMPL = textwrap.dedent("""
+    You are a high-level Contract Risk Analyst. Your task is to generate a comprehensive,
+    structured risk report for the **{user_role}** based on the cached document.
+    The output must be formatted with the main title and section headings in markdown.
+
+    1. **Identify the Top 3 Financial Risks** to the {user_role}.
+    2. **Identify the Top 3 Legal/Compliance Risks** (e.g., breach of contract, loss of rights).
+    3. For each risk, cite the **relevant Section number** and provide a brief **mitigation suggestion** (e.g., "Always pay by the 1st").
+    """)
+
+
+def log_cached_token_usage(response) -> None:
+    """Logs how many prompt tokens were served from Gemini's context cache.
+
+    A non-zero count confirms that the stable prompt prefix (instructions +
+    document) is hitting the implicit or explicit cache on repeated calls.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage and getattr(usage, "cached_content_token_count", None):
+        print(f"Gemini cache hit: {usage.cached_content_token_count} prompt tokens served from cache.")
+
+
+# Caps concurrent in-flight Gemini calls so a burst of requests self-throttles
+# instead of hammering the API into 429s that surface as 500s to clients.
+GEMINI_SEM = asyncio.Semaphore(int(os.environ.get("GEMINI_MAX_CONC", "4")))
+
+
+def _is_rate_limit_error(exc: BaseException) -> bool:
+    """True for Gemini 429 (rate limit) responses, which are worth retrying after backoff."""
+    return isinstance(exc, genai_errors.APIError) and exc.code == 429
+
+
+def _wait_for_rate_limit(retry_state) -> float:
+    """Waits the 429's Retry-After when the server provides one, else backs off exponentially."""
+    exc = retry_state.outcome.exception()
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), 30.0)
+        except ValueError:
+            pass  # HTTP-date form; fall through to the exponential schedule
+    return wait_random_exponential(multiplier=1, max=30)(retry_state)
+
+
+@retry(
+    wait=_wait_for_rate_limit,
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception(_is_rate_limit_error),
+    reraise=True,
+)
+async def generate_with_limits(client, prompt, config=None):
+    """Calls Gemini with bounded concurrency and exponential-backoff retry on 429."""
+    async with GEMINI_SEM:
+        return await client.aio.models.generate_content(
+            model='gemini-2.5-flash',
+            contents=prompt,
+            config=config,
+        )
+
+
+async def stream_gemini_sse(client, prompt, config=None):
+    """Yields a Gemini streamed completion as Server-Sent Events (data: {json} frames)."""
+    # The semaphore is held for the whole stream: a streaming call occupies a
+    # Gemini connection for its full duration, not just until the first chunk.
+    async with GEMINI_SEM:
+        stream = await client.aio.models.generate_content_stream(
+            model='gemini-2.5-flash',
+            contents=prompt,
+            config=config,
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield f"data: {json.dumps({'text': chunk.text})}\n\n"
+    yield "data: [DONE]\n\n"
+
 
 # --- FILE EXTRACTION UTILITIES ---
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extracts text from a PDF file using pypdf."""
+# Shared worker pool for document parsing, so extraction runs off the event loop
+# and PDF pages can be processed in parallel.
+EXTRACTION_EXECUTOR = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+
+def _safe_extract_page_text(page) -> str:
+    """Returns a PDF page's text, treating pypdf's None result as empty."""
+    return page.extract_text() or ""
+
+def extract_text_from_pdf(stream) -> str:
+    """Extracts text from a PDF file-like object using pypdf, parsing pages in parallel."""
     try:
-        reader = PdfReader(io.BytesIO(file_content))
-        text = "".join([page.extract_text() or "" for page in reader.pages[:10]])
-        return text.strip()
+        # strict=False skips pedantic xref validation, and the seekable upload
+        # stream lets pypdf resolve objects on demand rather than up front. Only
+        # the first 10 pages are ever instantiated, however large the document.
+        reader = PdfReader(stream, strict=False)
+        pages = (reader.pages[i] for i in range(min(10, len(reader.pages))))
+        # extract_text() is the dominant cost per page; fan the pages out across
+        # the worker pool and join the results lazily, in page order.
+        page_texts = EXTRACTION_EXECUTOR.map(_safe_extract_page_text, pages)
+        return "".join(page_texts).strip()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF extraction error: {e}")
 
-def extract_text_from_docx(file_content: bytes) -> str:
-    """Extracts text from a DOCX file using python-docx."""
+# Fully-qualified WordprocessingML tags: paragraph (<w:p>) and run text (<w:t>)
+WORDPROCESSINGML_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DOCX_PARAGRAPH_TAG = f"{{{WORDPROCESSINGML_NS}}}p"
+DOCX_TEXT_TAG = f"{{{WORDPROCESSINGML_NS}}}t"
+
+def extract_text_from_docx(stream) -> str:
+    """Extracts text from a DOCX file-like object by streaming its XML directly.
+
+    A DOCX is a zip containing word/document.xml; iterparse walks that XML and
+    collects each paragraph's text without building python-docx's full object
+    tree (one Paragraph/Run instance per element), which is markedly faster and
+    lighter for large contracts. Unlike python-docx's document.paragraphs, this
+    also walks paragraphs inside table cells, which legal contracts routinely
+    use for schedules and fee tables. Only <w:t> run text is collected, so
+    tracked-change deletions (<w:delText>) and field instructions never leak
+    into the output. Falls back to python-docx on parse errors.
+    """
     try:
-        document = DocxDocument(io.BytesIO(file_content))
-        text = "\n".join([paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()])
-        return text.strip()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"DOCX extraction error: {e}")
+        with zipfile.ZipFile(stream) as archive, archive.open("word/document.xml") as document_xml:
+            paragraphs = []
+            for _, elem in etree.iterparse(document_xml, events=("end",), tag=DOCX_PARAGRAPH_TAG):
+                text = "".join(t.text or "" for t in elem.iter(DOCX_TEXT_TAG))
+                if text.strip():
+                    paragraphs.append(text)
+                elem.clear()
+            return "\n".join(paragraphs).strip()
+    except Exception:
+        # python-docx tolerates more unusual packages; retry with it before failing.
+        try:
+            stream.seek(0)
+            document = DocxDocument(stream)
+            text = "\n".join([paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()])
+            return text.strip()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"DOCX extraction error: {e}")
 
 
 # --- PYDANTIC MODELS ---
 
 class UploadResponse(BaseModel):
     filename: str
+    document_id: str
     extracted_text: str
     text_length: int
 
 class ChatRequest(BaseModel):
-    document_text: str 
+    document_text: str | None = None
+    document_id: str | None = None  # id from /upload/; avoids re-sending the full text
     question: str
+    cached_content: str | None = None  # Gemini cache resource name from /create_document_cache/
 
 class ChatResponse(BaseModel):
     answer: str
@@ -79,10 +354,30 @@ class ChatResponse(BaseModel):
 class RewriteRequest(BaseModel):
     clause_text: str
 
+class PersonalizedSummaryRequest(BaseModel):
+    document_text: str | None = None
+    document_id: str | None = None
+    user_role: str
+
 class RiskSummaryRequest(BaseModel):
-    document_text: str
+    document_text: str | None = None
+    document_id: str | None = None
+    user_role: str
+    cached_content: str | None = None  # Gemini cache resource name from /create_document_cache/
+
+class AnalyzeDocumentRequest(BaseModel):
+    document_text: str | None = None
+    document_id: str | None = None
     user_role: str
 
+class CreateCacheRequest(BaseModel):
+    document_text: str | None = None
+    document_id: str | None = None
+
+class CreateCacheResponse(BaseModel):
+    cache_name: str
+    reused: bool
+
 
 # --- CORE AI API ENDPOINTS ---
 
@@ -90,13 +385,25 @@ class RiskSummaryRequest(BaseModel):
 async def upload_document(file: UploadFile = File(...)):
     """Handles document upload (PDF/DOCX) and returns the extracted text content."""
     
-    file_content = await file.read()
+    # Hand the parsers the underlying SpooledTemporaryFile instead of reading the
+    # whole upload into a bytes copy first — peak memory stays at the spool size
+    # rather than roughly twice the file size.
     mime_type = file.content_type
-    
+
     if mime_type == "application/pdf":
-        extracted_text = extract_text_from_pdf(file_content)
+        # Run extraction off the event loop so other requests keep being served.
+        # The default executor is used here; the per-page fan-out inside
+        # extract_text_from_pdf uses EXTRACTION_EXECUTOR, so the two pools
+        # cannot starve each other.
+        extracted_text = await asyncio.get_running_loop().run_in_executor(
+            None, extract_text_from_pdf, file.file
+        )
     elif mime_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-        extracted_text = extract_text_from_docx(file_content)
+        # python-docx parses the whole XML tree synchronously; push it to a
+        # worker thread so the event loop is not stalled for the duration.
+        extracted_text = await asyncio.get_running_loop().run_in_executor(
+            EXTRACTION_EXECUTOR, extract_text_from_docx, file.file
+        )
     else:
         raise HTTPException(status_code=400, detail="Invalid file type. Only PDF and DOCX are supported.")
 
@@ -105,37 +412,79 @@ async def upload_document(file: UploadFile = File(...)):
 
     return {
         "filename": file.filename,
+        "document_id": store_document_text(extracted_text),
         "extracted_text": extracted_text,
         "text_length": len(extracted_text)
     }
 
-@app.post("/chat_with_document/", response_model=ChatResponse)
-async def chat_with_document(request: ChatRequest):
-    """Uses Gemini to answer user questions based on the provided document text (RAG)."""
-    
-    client = get_gemini_client() 
+@app.post("/create_document_cache/", response_model=CreateCacheResponse)
+async def create_document_cache(request: CreateCacheRequest):
+    """Creates (or reuses) an explicit Gemini context cache for a document.
 
-    prompt = textwrap.dedent(f"""
-    You are a professional Legal Assistant, named the 'Conversational Legal Twin'. 
-    Your primary function is to simplify complex legal information and answer the user's question 
-    based **STRICTLY AND ONLY** on the legal document provided below.
-    
-    If you cannot find a direct answer or relevant clause in the document, state clearly: 
-    "The answer to that question could not be found in the provided document."
+    Subsequent /chat_with_document/ and /generate_risk_summary/ calls can pass the
+    returned cache name as 'cached_content' so only the question tokens are sent,
+    instead of re-transmitting the full document on every request.
+    """
 
-    --- LEGAL DOCUMENT TEXT ---
-    {request.document_text}
-    --- END OF DOCUMENT ---
+    client = get_gemini_client()
+    document_text = resolve_document_text(request)
 
-    USER QUESTION: {request.question}
-    """)
+    doc_hash = hashlib.sha256(document_text.encode("utf-8")).hexdigest()
+
+    # Reuse an existing cache for identical document content (e.g. re-uploads)
+    cache_name = DOCUMENT_CACHE_REGISTRY.get(doc_hash)
+    if cache_name:
+        return {"cache_name": cache_name, "reused": True}
 
     try:
-        response = client.models.generate_content(
+        cache = await client.aio.caches.create(
             model='gemini-2.5-flash',
-            contents=prompt,
+            config=genai_types.CreateCachedContentConfig(
+                contents=[document_text],
+                system_instruction=CACHE_SYSTEM_INSTRUCTION,
+                ttl=DOCUMENT_CACHE_TTL,
+            ),
         )
-        
+        DOCUMENT_CACHE_REGISTRY[doc_hash] = cache.name
+        return {"cache_name": cache.name, "reused": False}
+
+    except Exception as e:
+        print(f"Gemini Cache Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Could not create document cache: {e}")
+
+
+@app.post("/chat_with_document/", response_model=ChatResponse)
+async def chat_with_document(request: ChatRequest, stream: bool = False):
+    """Uses Gemini to answer user questions based on the provided document text (RAG).
+
+    Pass ?stream=1 to receive the answer incrementally as Server-Sent Events
+    instead of waiting for the full completion.
+    """
+
+    client = get_gemini_client()
+
+    if request.cached_content:
+        # The document lives in the Gemini context cache; only send the question.
+        prompt = f"USER QUESTION: {request.question}"
+        config = genai_types.GenerateContentConfig(cached_content=request.cached_content)
+    else:
+        prompt = CHAT_PROMPT_PREFIX + resolve_document_text(request) + CHAT_PROMPT_SUFFIX_TMPL.format(question=request.question)
+        config = None
+
+    if stream:
+        return StreamingResponse(stream_gemini_sse(client, prompt, config), media_type="text/event-stream")
+
+    cache_key = response_cache_key("chat", request.cached_content or "", prompt)
+    cached = response_cache_get(cache_key)
+    if cached is not None:
+        return {"answer": cached}
+
+    try:
+        response = await generate_with_limits(client, prompt, config)
+        log_cached_token_usage(response)
+        if response.text:
+            response_cache_put(cache_key, response.text)
+
         return {"answer": response.text}
 
     except Exception as e:
@@ -149,97 +498,208 @@ async def rewrite_clause(request: RewriteRequest):
     
     client = get_gemini_client()
 
-    rewrite_prompt = textwrap.dedent(f"""
-    You are an expert Plain Language Translator. Your task is to rewrite the
-    following legal clause into simple, easy-to-understand English.
-    The rewritten text must preserve the full original legal meaning and risk, but use
-    no legal jargon.
+    rewrite_prompt = REWRITE_PROMPT_PREFIX + request.clause_text + "\n"
 
-    --- ORIGINAL CLAUSE ---
-    {request.clause_text}
-    """)
+    cache_key = response_cache_key("rewrite", request.clause_text)
+    cached = response_cache_get(cache_key)
+    if cached is not None:
+        return {"simplified_text": cached}
 
     try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=rewrite_prompt,
-        )
+        response = await generate_with_limits(client, rewrite_prompt)
+        log_cached_token_usage(response)
+        if response.text:
+            response_cache_put(cache_key, response.text)
         return {"simplified_text": response.text}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI rewriting failed: {e}")
 
 
+@app.post("/personalized_summary/")
+async def personalized_summary(request: PersonalizedSummaryRequest):
+    """Summarizes the document from the perspective of a specific role (e.g., Tenant)."""
+
+    client = get_gemini_client()
+
+    # Static instructions and the document first, variable role last, matching the
+    # implicit-cache-friendly ordering used by the other endpoints.
+    summary_prompt = PERSONALIZED_PROMPT_PREFIX + resolve_document_text(request) + ROLE_PROMPT_SUFFIX_TMPL.format(user_role=request.user_role)
+
+    cache_key = response_cache_key("personalized_summary", summary_prompt)
+    cached = response_cache_get(cache_key)
+    if cached is not None:
+        return {"summary": cached}
+
+    try:
+        response = await generate_with_limits(client, summary_prompt)
+        log_cached_token_usage(response)
+        if response.text:
+            response_cache_put(cache_key, response.text)
+        return {"summary": response.text}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI summary generation failed: {e}")
+
+
 @app.post("/generate_risk_summary/")
-async def generate_risk_summary(request: RiskSummaryRequest):
-    """Generates a structured, exportable summary of only the risks for a role."""
-    
+async def generate_risk_summary(request: RiskSummaryRequest, stream: bool = False):
+    """Generates a structured, exportable summary of only the risks for a role.
+
+    Pass ?stream=1 to receive the report incrementally as Server-Sent Events
+    instead of waiting for the full completion.
+    """
+
     client = get_gemini_client()
 
-    risk_prompt = textwrap.dedent(f"""
-    You are a high-level Contract Risk Analyst. Your task is to generate a comprehensive, 
-    structured risk report for the **{request.user_role}** based on the document below. 
-    The output must be formatted with the main title and section headings in markdown.
+    if request.cached_content:
+        # The document lives in the Gemini context cache; only send the task instructions.
+        risk_prompt = RISK_CACHED_PROMPT_TMPL.format(user_role=request.user_role)
+        config = genai_types.GenerateContentConfig(cached_content=request.cached_content)
+    else:
+        risk_prompt = RISK_PROMPT_PREFIX + resolve_document_text(request) + ROLE_PROMPT_SUFFIX_TMPL.format(user_role=request.user_role)
+        config = None
 
-    1. **Identify the Top 3 Financial Risks** to the {request.user_role}.
-    2. **Identify the Top 3 Legal/Compliance Risks** (e.g., breach of contract, loss of rights).
-    3. For each risk, cite the **relevant Section number** and provide a brief **mitigation suggestion** (e.g., "Always pay by the 1st").
+    if stream:
+        return StreamingResponse(stream_gemini_sse(client, risk_prompt, config), media_type="text/event-stream")
 
-    --- LEGAL DOCUMENT TEXT ---
-    {request.document_text}
-    """)
+    cache_key = response_cache_key("risk_summary", request.cached_content or "", risk_prompt)
+    cached = response_cache_get(cache_key)
+    if cached is not None:
+        return {"risk_report": cached}
 
     try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=risk_prompt,
-        )
+        response = await generate_with_limits(client, risk_prompt, config)
+        log_cached_token_usage(response)
+        if response.text:
+            response_cache_put(cache_key, response.text)
         return {"risk_report": response.text}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI risk report generation failed: {e}")
 
 
+@app.post("/analyze_document/")
+async def analyze_document(request: AnalyzeDocumentRequest):
+    """Runs the role-based summary and risk report for a document in one round-trip.
+
+    The UI's initial document view needs both; issuing the two Gemini calls
+    concurrently here collapses sequential round-trips into one wall-clock wait.
+    """
+
+    client = get_gemini_client()
+    document_text = resolve_document_text(request)
+
+    summary_prompt = PERSONALIZED_PROMPT_PREFIX + document_text + ROLE_PROMPT_SUFFIX_TMPL.format(user_role=request.user_role)
+    risk_prompt = RISK_PROMPT_PREFIX + document_text + ROLE_PROMPT_SUFFIX_TMPL.format(user_role=request.user_role)
+
+    # Shares cache entries with /personalized_summary/ and /generate_risk_summary/
+    summary_key = response_cache_key("personalized_summary", summary_prompt)
+    risk_key = response_cache_key("risk_summary", "", risk_prompt)
+    summary = response_cache_get(summary_key)
+    risk_report = response_cache_get(risk_key)
+
+    async def generate(prompt: str) -> str:
+        response = await generate_with_limits(client, prompt)
+        log_cached_token_usage(response)
+        return response.text
+
+    try:
+        if summary is None and risk_report is None:
+            summary, risk_report = await asyncio.gather(generate(summary_prompt), generate(risk_prompt))
+        elif summary is None:
+            summary = await generate(summary_prompt)
+        elif risk_report is None:
+            risk_report = await generate(risk_prompt)
+
+        if summary:
+            response_cache_put(summary_key, summary)
+        if risk_report:
+            response_cache_put(risk_key, risk_report)
+        return {"summary": summary, "risk_report": risk_report}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI document analysis failed: {e}")
+
+
 # --- REACT STATIC FILE SERVING ---
 
-# 1. Mount the /static route to serve assets like JS/CSS/Maps
-# This handles requests like /static/js/main.ed54bb15.js
-app.mount("/static", StaticFiles(directory=BUILD_DIR / "static"), name="static")
+# NOTE: there is deliberately no StaticFiles mount for /static. The manifest
+# below covers every build file (including static/js and static/css), and a
+# mount registered ahead of the catch-all would shadow it, serving the
+# fingerprinted bundles from disk without the in-memory/ETag handling.
+
+# Only files up to this size are kept in memory; larger ones fall back to FileResponse
+STATIC_BYTES_CACHE_LIMIT = 1 << 20
+
+def build_static_manifest() -> dict:
+    """Walks the build directory once and maps URL paths to (file path, MIME type, bytes, ETag).
+
+    Doing the directory stat and mimetypes lookup at startup means each static
+    request is a single dict lookup instead of per-request filesystem calls.
+    Small files are additionally read into memory with a content-hash ETag, so
+    the hot bundle assets are served with zero disk I/O and can answer
+    If-None-Match revalidations with a 304.
+    """
+    manifest = {}
+    if BUILD_DIR.is_dir():
+        for path in BUILD_DIR.rglob("*"):
+            if path.is_file():
+                mime_type, _ = mimetypes.guess_type(path)
+                content = etag = None
+                if path.stat().st_size <= STATIC_BYTES_CACHE_LIMIT:
+                    content = path.read_bytes()
+                    etag = f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"'
+                manifest[path.relative_to(BUILD_DIR).as_posix()] = (path, mime_type, content, etag)
+    return manifest
+
+
+STATIC_MANIFEST = build_static_manifest()
+
+# Read once at import: the SPA fallback serves this on every client-side route,
+# and a per-hit synchronous disk read would block the event loop each time.
+INDEX_HTML = (BUILD_DIR / "index.html").read_bytes() if (BUILD_DIR / "index.html").is_file() else None
 
-# 2. Main catch-all for the Single-Page Application (SPA) - Must be last!
+
+# Main catch-all for the Single-Page Application (SPA) - Must be last!
 @app.get("/{file_path:path}")
-async def serve_react_app(file_path: str):
+async def serve_react_app(file_path: str, request: Request):
     """
-    Serves static files from the build directory, falling back to index.html 
-    for SPA routing (Fixes the UnicodeDecodeError).
+    Serves known build files via the precomputed manifest, falling back to
+    index.html for SPA routing (Fixes the UnicodeDecodeError).
     """
-    path_to_file = BUILD_DIR / file_path
-    
-    # Check if the requested file exists in the build directory
-    if path_to_file.is_file():
-        # Use mimetypes to automatically detect the file type for correct serving
-        mime_type, _ = mimetypes.guess_type(path_to_file)
-        
-        # Use FileResponse for direct file serving (works for both binary and text)
+    entry = STATIC_MANIFEST.get(file_path)
+
+    if entry is not None:
+        path_to_file, mime_type, content, etag = entry
+
+        if content is not None:
+            headers = {"ETag": etag}
+            if file_path.startswith("static/"):
+                # React fingerprints bundle filenames, so their content never changes
+                headers["Cache-Control"] = "public, max-age=31536000, immutable"
+            else:
+                headers["Cache-Control"] = "no-cache"
+
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers=headers)
+            return Response(content=content, media_type=mime_type, headers=headers)
+
+        # Large files are not cached in memory; stream them from disk
         return FileResponse(path_to_file, media_type=mime_type)
 
-    # If the file path is a directory, or the file doesn't exist, serve index.html (SPA fallback)
+    # Unknown paths are SPA routes; serve index.html
     return await serve_index_html()
 
-# 3. Dedicated function to serve the main index.html file
+# Dedicated function to serve the main index.html file
 async def serve_index_html():
-    """Reads and serves the main index.html for the React application."""
-    index_path = BUILD_DIR / "index.html"
-    
-    if not index_path.is_file():
+    """Serves the in-memory index.html for the React application."""
+
+    if INDEX_HTML is None:
         # This means the React build is missing or the path is wrong
         return HTMLResponse(
             status_code=404,
             content="<h1>404 Not Found</h1><p>Frontend 'index.html' not found. Did you run 'npm run build' and place the 'build' folder correctly?</p>"
         )
-    
-    # Read the file content and serve as HTML
-    with open(index_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    return HTMLResponse(html_content, media_type="text/html")
+
+    return HTMLResponse(INDEX_HTML, media_type="text/html")
@@ -82,7 +82,43 @@ def chat_with_document(document_text: str, question: str):
     except requests.exceptions.RequestException as e:
         print(f"Connection Error: {e}")
 
-COMPLEX_CLAUSE = "The Tenant MAY NOT terminate this Agreement early without the Landlord's written consent. Should the Tenant breach this clause and vacate the Premises early, the Tenant shall be liable for three (3) months' rent as an early termination fee, in addition to any unpaid rent accrued up to the date of vacation."
+def chat_with_document_stream(document_text: str, question: str):
+    """
+    Tests the /chat_with_document/?stream=1 endpoint (Server-Sent Events).
+    """
+    print("\n--- 2b. Testing /chat_with_document/?stream=1 (SSE streaming) ---")
+
+    payload = {
+        "document_text": document_text,
+        "question": question
+    }
+
+    try:
+        with requests.post(
+            f"{API_URL}/chat_with_document/?stream=1",
+            json=payload,
+            stream=True,
+            timeout=60
+        ) as response:
+            response.raise_for_status()
+
+            print(f"Question: {question}")
+            print("\n--- AI Response (streamed) ---")
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                print(json.loads(data)["text"], end="", flush=True)
+            print("\n------------------------------\n")
+
+    except requests.exceptions.HTTPError as errh:
+        print(f"HTTP Error: {errh}")
+    except requests.exceptions.RequestException as e:
+        print(f"Connection Error: {e}")
+
+COMPLEX_CLAUSE ="The Tenant MAY NOT terminate this Agreement early without the Landlord's written consent. Should the Tenant breach this clause and vacate the Premises early, the Tenant shall be liable for three (3) months' rent as an early termination fee, in addition to any unpaid rent accrued up to the date of vacation."
 
 def test_rewrite_clause():
     """
@@ -152,6 +188,32 @@ def test_risk_summary(document_text: str):
     except requests.exceptions.RequestException as e:
         print(f"Error testing risk summary endpoint: {e}")
 
+def test_analyze_document(document_text: str):
+    """
+    Tests the batched /analyze_document/ endpoint (summary + risk report in one call).
+    """
+    ROLE = "Tenant"
+    print(f"\n--- 6. Testing /analyze_document/ for role: {ROLE} ---")
+
+    payload = {
+        "document_text": document_text,
+        "user_role": ROLE
+    }
+
+    try:
+        response = requests.post(f"{API_URL}/analyze_document/", json=payload, timeout=60)
+        response.raise_for_status()
+
+        data = response.json()
+        print("\n--- Combined Analysis (Summary) ---")
+        print(data['summary'])
+        print("\n--- Combined Analysis (Risk Report) ---")
+        print(data['risk_report'])
+        print("---------------------------------------\n")
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error testing analyze document endpoint: {e}")
+
 # --- Main Execution ---
 if __name__ == "__main__":
     
@@ -167,7 +229,10 @@ if __name__ == "__main__":
     if extracted_text and len(extracted_text) > 50: # Check for minimum length
         # Test 2: Conversational Twin
         chat_with_document(extracted_text, TEST_QUESTION)
-        
+
+        # Test 2b: Streamed variant of the Conversational Twin
+        chat_with_document_stream(extracted_text, TEST_QUESTION)
+
         # Test 3: Clause Rewriting
         test_rewrite_clause()
         
@@ -176,5 +241,8 @@ if __name__ == "__main__":
 
         # New Test 5: Risk Summary
         test_risk_summary(extracted_text)
+
+        # Test 6: Batched Analysis (summary + risks in one round-trip)
+        test_analyze_document(extracted_text)
     else:
         print("\nSkipping chat test due to failed or empty text extraction.")
\ No newline at end of file